@@ -1,113 +1,671 @@
-import copy
 import re
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from itertools import islice, repeat
+from typing import Any, AsyncIterator, Callable, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+
+def _path_source(parts: Sequence[str]) -> List[str]:
+    """Statements leaving the value at a dotted path (or None) in `v`, starting from dict `d`."""
+    lines = [f"v = d.get({parts[0]!r})"]
+    lines.extend(f"v = v.get({part!r}) if isinstance(v, dict) else None" for part in parts[1:])
+    return lines
+
+
+_ACCESSORS: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+
+
+def _make_accessor(dotted_key: str) -> Callable[[Dict[str, Any]], Any]:
+    body = "".join(f"    {line}\n" for line in _path_source(dotted_key.split(".")))
+    namespace: Dict[str, Any] = {}
+    exec(f"def _get(d):\n{body}    return v\n", namespace)
+    _ACCESSORS[dotted_key] = namespace["_get"]
+    return namespace["_get"]
 
 
 def _get_value(doc: Dict[str, Any], dotted_key: str) -> Any:
     """Support dotted paths like 'agent_info.id'."""
-    parts = dotted_key.split(".")
-    value: Any = doc
-    for part in parts:
-        if isinstance(value, dict) and part in value:
-            value = value[part]
+    if "." not in dotted_key:
+        return doc.get(dotted_key) if isinstance(doc, dict) else None
+    return (_ACCESSORS.get(dotted_key) or _make_accessor(dotted_key))(doc)
+
+
+_REGEX_SPECIAL = frozenset(".^$*+?{}[]\\|()")
+
+
+@lru_cache(maxsize=1024)
+def _regex_matcher(pattern: str, flags: int) -> Callable[[str], Any]:
+    """Compile a $regex once per process; anchored literals become a prefix test."""
+    prefix = pattern[1:]
+    if not flags and pattern.startswith("^") and not _REGEX_SPECIAL.intersection(prefix):
+        return lambda value: value.startswith(prefix)
+    return re.compile(pattern, flags).search
+
+
+# A prepared query is a list of (path, tests) clauses. path is a plain key, a
+# tuple of dotted parts, or None for an $or whose tests are prepared sub-queries.
+# _compile_query turns it into generated code.
+PreparedQuery = List[Tuple[Any, List[Any]]]
+
+
+_TEST_COST = {"$eq": 0, "$ne": 0, "$in_set": 1, "$in": 1, "$gt": 2, "$gte": 2, "$lt": 2, "$lte": 2, "$regex": 3}
+
+
+def _query_cost(prepared: PreparedQuery) -> int:
+    """Rough per-document cost of a prepared query: its most expensive test."""
+    cost = 0
+    for path, tests in prepared:
+        if path is None:
+            cost = max([cost, 3, *map(_query_cost, tests)])
         else:
-            return None
-    return value
+            cost = max([cost, *(_TEST_COST[op] for op, _ in tests)])
+    return cost
 
 
-def _matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
-    """Very small subset of Mongo style matching used in this API."""
+def _prepare_query(query: Dict[str, Any]) -> PreparedQuery:
+    """Very small subset of Mongo style matching used in this API, resolved once per query."""
+    prepared: PreparedQuery = []
     for key, expected in query.items():
         if key == "$or":
-            if not any(_matches(doc, sub) for sub in expected):
-                return False
+            # Any branch may satisfy the $or, so try the cheap ones first.
+            prepared.append((None, sorted((_prepare_query(sub) for sub in expected), key=_query_cost)))
             continue
 
-        actual = _get_value(doc, key)
+        path = tuple(key.split(".")) if "." in key else key
+        tests: List[Tuple[str, Any]] = []
         if isinstance(expected, dict):
             if "$regex" in expected:
-                pattern = expected["$regex"]
                 flags = re.IGNORECASE if expected.get("$options", "") == "i" else 0
-                if not isinstance(actual, str) or not re.search(pattern, actual, flags):
-                    return False
-            if "$gte" in expected and (actual is None or actual < expected["$gte"]):
-                return False
-            if "$lte" in expected and (actual is None or actual > expected["$lte"]):
-                return False
-            if "$in" in expected and actual not in expected["$in"]:
-                return False
+                tests.append(("$regex", _regex_matcher(expected["$regex"], flags)))
+            for op in ("$ne", "$gt", "$gte", "$lt", "$lte"):
+                if op in expected:
+                    tests.append((op, expected[op]))
+            if "$in" in expected:
+                try:
+                    tests.append(("$in_set", frozenset(expected["$in"])))
+                except TypeError:  # unhashable candidates keep list membership
+                    tests.append(("$in", expected["$in"]))
+        else:
+            tests.append(("$eq", expected))
+        prepared.append((path, tests))
+    return prepared
+
+
+_TEST_SOURCE = {
+    "$eq": "if v != {c}: return False",
+    "$ne": "if v == {c}: return False",
+    "$regex": "if not isinstance(v, str) or not {c}(v): return False",
+    "$gt": "if v is None or v <= {c}: return False",
+    "$gte": "if v is None or v < {c}: return False",
+    "$lt": "if v is None or v >= {c}: return False",
+    "$lte": "if v is None or v > {c}: return False",
+    "$in": "if v not in {c}: return False",
+    # Unhashable values (lists, dicts) can't equal any hashable candidate.
+    "$in_set": "if v.__hash__ is None or v not in {c}: return False",
+}
+
+
+@lru_cache(maxsize=256)
+def _predicate_factory(shape: Tuple[Tuple[Any, Any], ...], attributes: bool) -> Callable[..., Callable[[Any], bool]]:
+    """Generate a predicate for one query shape; operands are bound later as c0, c1, ...
+
+    With attributes=True the predicate reads plain fields as slots of a row object
+    (see FakeCollection's row_type) instead of calling dict.get.
+    """
+    params: List[str] = []
+    lines: List[str] = []
+
+    def operand() -> str:
+        params.append(f"c{len(params)}")
+        return params[-1]
+
+    for path, ops in shape:
+        if path is None:  # $or over `ops` compiled sub-predicates
+            subs = [operand() for _ in range(ops)]
+            lines.append(f"if not ({' or '.join(f'{sub}(d)' for sub in subs)}): return False" if subs else "return False")
+            continue
+        if type(path) is not str:
+            lines.extend(_path_source(path))
+        elif attributes:
+            lines.append(f"v = d.{path}")
         else:
-            if actual != expected:
-                return False
-    return True
+            lines.append(f"v = d.get({path!r})")
+        lines.extend(_TEST_SOURCE[op].format(c=operand()) for op in ops)
+    lines.append("return True")
 
+    source = f"def _factory({', '.join(params)}):\n    def _predicate(d):\n"
+    source += "".join(f"        {line}\n" for line in lines)
+    source += "    return _predicate\n"
+    namespace: Dict[str, Any] = {}
+    exec(source, namespace)
+    return namespace["_factory"]
 
-def _apply_projection(doc: Dict[str, Any], projection: Optional[Dict[str, int]]) -> Dict[str, Any]:
+
+def _compile_prepared(prepared: PreparedQuery, attributes: bool = False) -> Callable[[Any], bool]:
+    shape: List[Tuple[Any, Any]] = []
+    operands: List[Any] = []
+    for path, tests in prepared:
+        if path is None:
+            shape.append((None, len(tests)))
+            operands.extend(_compile_prepared(sub, attributes) for sub in tests)
+        else:
+            shape.append((path, tuple(op for op, _ in tests)))
+            operands.extend(expected for _, expected in tests)
+    return _predicate_factory(tuple(shape), attributes)(*operands)
+
+
+def _compile_query(query: Dict[str, Any]) -> Callable[[Dict[str, Any]], bool]:
+    """Turn a query into a plain Python predicate; code is cached per shape, not per value."""
+    return _compile_prepared(_prepare_query(query))
+
+
+def _query_paths(prepared: PreparedQuery) -> Set[Any]:
+    paths: Set[Any] = set()
+    for path, tests in prepared:
+        if path is None:
+            for sub in tests:
+                paths |= _query_paths(sub)
+        else:
+            paths.add(path)
+    return paths
+
+
+def _fast_clone(obj: Any) -> Any:
+    """Copy JSON-shaped data; scalars are immutable and returned as-is."""
+    if type(obj) is dict:
+        return {key: _fast_clone(value) for key, value in obj.items()}
+    if type(obj) is list:
+        return [_fast_clone(value) for value in obj]
+    return obj
+
+
+def _is_number(value: Any) -> bool:
+    """Plain ints and floats (not bools, not NaN) that a float64 column compares like Python does."""
+    return type(value) in (int, float) and value == value
+
+
+def _excluded_keys(projection: Optional[Dict[str, int]]) -> FrozenSet[str]:
+    """Keys dropped by a Mongo style exclusion projection such as {"_id": 0}."""
     if not projection:
-        return copy.deepcopy(doc)
+        return frozenset()
+    return frozenset(key for key, include in projection.items() if include == 0)
+
+
+def _apply_projection(doc: Dict[str, Any], excluded: FrozenSet[str], clone: bool = True) -> Dict[str, Any]:
+    if not any(key in doc for key in excluded):
+        return _fast_clone(doc) if clone else doc
+    if clone:
+        return {key: _fast_clone(value) for key, value in doc.items() if key not in excluded}
+    return {key: value for key, value in doc.items() if key not in excluded}
+
+
+def _order_key(value: Any) -> Tuple[bool, Any]:
+    """Approximate BSON ordering: null sorts before every other value."""
+    return (value is not None, value if value is not None else 0)
+
+
+_COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: _order_key(a) > _order_key(b),
+    "$gte": lambda a, b: _order_key(a) >= _order_key(b),
+    "$lt": lambda a, b: _order_key(a) < _order_key(b),
+    "$lte": lambda a, b: _order_key(a) <= _order_key(b),
+}
+
+
+def _evaluate(expression: Any, doc: Dict[str, Any]) -> Any:
+    """Evaluate the subset of aggregation expressions the API uses: field paths, $cond and comparisons."""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _get_value(doc, expression[1:])
+    if not isinstance(expression, dict) or len(expression) != 1:
+        return expression
+    (operator, args), = expression.items()
+    if operator == "$cond":
+        if isinstance(args, dict):
+            args = [args["if"], args["then"], args["else"]]
+        return _evaluate(args[1] if _evaluate(args[0], doc) else args[2], doc)
+    if operator in _COMPARISONS:
+        return _COMPARISONS[operator](_evaluate(args[0], doc), _evaluate(args[1], doc))
+    raise NotImplementedError(f"Unsupported aggregation operator: {operator}")
+
+
+def _sort_documents(docs: Iterable[Dict[str, Any]], spec: Dict[str, int]) -> List[Dict[str, Any]]:
+    ordered = list(docs)
+    # Stable sorts applied from the least to the most significant key.
+    for field, direction in reversed(list(spec.items())):
+        ordered.sort(key=lambda doc: _order_key(_get_value(doc, field)), reverse=direction < 0)
+    return ordered
+
+
+def _unwind_documents(docs: Iterable[Dict[str, Any]], path: str) -> Iterator[Dict[str, Any]]:
+    """One output document per array element; documents with a missing or empty array are dropped."""
+    field = path[1:]
+    for doc in docs:
+        values = doc.get(field)
+        if isinstance(values, list):
+            for value in values:
+                yield {**doc, field: value}
+        elif values is not None:
+            yield doc
+
+
+def _replace_roots(docs: Iterable[Dict[str, Any]], expression: Any) -> Iterator[Dict[str, Any]]:
+    for doc in docs:
+        root = _evaluate(expression, doc)
+        if not isinstance(root, dict):
+            raise ValueError("$replaceRoot newRoot must evaluate to a document")
+        yield root
 
-    result = copy.deepcopy(doc)
-    for key, include in projection.items():
-        if include == 0 and key in result:
-            result.pop(key, None)
-    return result
+
+_COLUMN_RANGES = {"$gt": np.greater, "$gte": np.greater_equal, "$lt": np.less, "$lte": np.less_equal}
+
+
+class UpdateResult(NamedTuple):
+    """The fields of pymongo's UpdateResult the API reads; upserted_id is the internal key."""
+
+    matched_count: int
+    modified_count: int
+    upserted_id: Optional[int] = None
+
+
+class DeleteResult(NamedTuple):
+    deleted_count: int
 
 
 class FakeCursor:
-    def __init__(self, docs: List[Dict[str, Any]]):
-        self.docs = docs
+    """Lazily projects matches; only the documents actually returned are cloned."""
+
+    def __init__(self, docs: Iterable[Dict[str, Any]], projection: Optional[Dict[str, int]] = None):
+        self._docs = iter(docs)
+        self._excluded = _excluded_keys(projection)
+        self._limit: Optional[int] = None
 
-    async def to_list(self, limit: int) -> List[Dict[str, Any]]:
-        return self.docs[:limit]
+    def limit(self, limit: int) -> "FakeCursor":
+        """Cap the number of documents returned; 0 means no limit, as in pymongo."""
+        self._limit = limit or None
+        return self
+
+    def sort(self, key_or_list: Any, direction: int = 1) -> "FakeCursor":
+        """Accepts pymongo's sort("field", -1) and sort([("a", 1), ("b", -1)]) forms."""
+        spec = dict([(key_or_list, direction)] if isinstance(key_or_list, str) else key_or_list)
+        # Sorting only orders references; documents are still cloned as they are taken.
+        self._docs = iter(_sort_documents(self._docs, spec))
+        return self
+
+    def batch_size(self, batch_size: int) -> "FakeCursor":  # nothing to batch in memory
+        return self
+
+    def _take(self, length: Optional[int]) -> Iterator[Dict[str, Any]]:
+        if self._limit is not None:
+            length = self._limit if length is None else min(length, self._limit)
+        # The underlying generator stops scanning as soon as `length` matches are found.
+        return islice(self._docs, length)
+
+    async def to_list(self, limit: Optional[int]) -> List[Dict[str, Any]]:
+        return [_apply_projection(doc, self._excluded) for doc in self._take(limit)]
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        for doc in self._take(None):
+            yield _apply_projection(doc, self._excluded)
 
 
 class FakeCollection:
-    def __init__(self, initial: Optional[List[Dict[str, Any]]] = None):
-        self.data: List[Dict[str, Any]] = initial or []
+    def __init__(
+        self,
+        initial: Optional[Iterable[Dict[str, Any]]] = None,
+        indexes: Sequence[str] = ("id",),
+        columns: Sequence[str] = (),
+        row_type: Optional[type] = None,
+    ):
+        # Documents are keyed by insertion order so index buckets can refer to them.
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        self._next_key = 0
+        self._indexes: Dict[str, Dict[Any, Set[int]]] = {field: {} for field in indexes}
+        # Primary-key shortcut: id -> key of the first stored document with that id.
+        self._by_id: Optional[Dict[Any, int]] = {} if "id" in self._indexes else None
+        # Numeric fields mirrored into float64 arrays for vectorised range scans.
+        # Built on first use and kept in step with writes row by row.
+        self._column_fields = tuple(columns)
+        self._column_roots = frozenset(field.split(".")[0] for field in columns)
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+        self._column_keys = np.empty(0, dtype=np.int64)
+        # Optional __slots__ mirror of top-level fields for attribute-access predicates.
+        self._row_type = row_type
+        self._row_fields: FrozenSet[str] = frozenset(getattr(row_type, "__slots__", ()))
+        self._rows: Dict[int, Any] = {}
+        # Set by InMemoryDB so $lookup can reach sibling collections.
+        self.database: Optional[Any] = None
+        for doc in initial or ():
+            self._store(doc)
+        # Initial documents are stored by reference and may be shared (e.g. the
+        # cached seed data); they are copied on their first write.
+        self._borrowed: Set[int] = set(self._docs)
+
+    @property
+    def data(self) -> List[Dict[str, Any]]:
+        return list(self._docs.values())
+
+    def _store(self, doc: Dict[str, Any]) -> None:
+        key = self._next_key
+        self._next_key += 1
+        self._docs[key] = doc
+        self._track(key, doc)
+        if self._columns is not None:
+            # Keys only grow, so the new row goes at the end of every column.
+            self._column_keys = np.append(self._column_keys, key)
+            for field, column in self._columns.items():
+                self._columns[field] = np.append(column, np.nan)
+            self._column_write(len(self._column_keys) - 1, doc)
+
+    def _column_store(self) -> Dict[str, np.ndarray]:
+        if self._columns is None:
+            self._columns = {}
+            self._column_keys = np.fromiter(self._docs, dtype=np.int64, count=len(self._docs))
+            for field in self._column_fields:
+                values = [_get_value(doc, field) for doc in self._docs.values()]
+                # Fields holding anything but numbers/None stay on the scan path.
+                if all(value is None or _is_number(value) for value in values):
+                    self._columns[field] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        return self._columns
+
+    def _column_write(self, position: int, doc: Dict[str, Any]) -> None:
+        """Copy a document's column fields into row `position` of the column cache."""
+        for field, column in self._columns.items():
+            value = _get_value(doc, field)
+            if not (value is None or _is_number(value)):
+                # The field no longer vectorises; rebuild (without it) on next use.
+                self._columns = None
+                return
+            column[position] = np.nan if value is None else value
+
+    def _column_match(self, field: str, expected: Any) -> Optional[Set[int]]:
+        """Resolve an equality or range predicate on a numeric column, or None if it can't."""
+        if isinstance(expected, dict):
+            if not expected or not set(expected) <= set(_COLUMN_RANGES) or not all(map(_is_number, expected.values())):
+                return None
+        elif not _is_number(expected):
+            return None
+        column = self._column_store().get(field)
+        if column is None:
+            return None
+
+        # NaN (missing/None) compares false, matching the scan's "actual is None" checks.
+        if isinstance(expected, dict):
+            mask = np.ones(len(column), dtype=bool)
+            for op, bound in expected.items():
+                mask &= _COLUMN_RANGES[op](column, bound)
+        else:
+            mask = column == expected
+        return set(self._column_keys[mask].tolist())
+
+    def _track(self, key: int, doc: Dict[str, Any]) -> None:
+        """Register a stored document with the indexes, row mirror and column cache."""
+        if self._row_type is not None:
+            self._rows[key] = self._row_type(doc)
+        for field, buckets in self._indexes.items():
+            try:
+                buckets.setdefault(_get_value(doc, field), set()).add(key)
+            except TypeError:  # unhashable values (lists, dicts) are left to the scan
+                pass
+        self._sync_by_id(doc)
+
+    def _untrack(self, key: int, doc: Dict[str, Any]) -> None:
+        self._rows.pop(key, None)
+        for field, buckets in self._indexes.items():
+            try:
+                value = _get_value(doc, field)
+                bucket = buckets.get(value)
+            except TypeError:
+                continue
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del buckets[value]
+        self._sync_by_id(doc)
+
+    def _sync_by_id(self, doc: Dict[str, Any]) -> None:
+        if self._by_id is None:
+            return
+        doc_id = doc.get("id")
+        try:
+            bucket = self._indexes["id"].get(doc_id)
+        except TypeError:
+            return
+        if bucket:
+            self._by_id[doc_id] = min(bucket)
+        else:
+            self._by_id.pop(doc_id, None)
+
+    def _select(self, query: Dict[str, Any]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Yield matching (key, doc) pairs, narrowing by index before scanning."""
+        buckets: List[Set[int]] = []
+        residual: Dict[str, Any] = {}
+        for field, expected in query.items():
+            if field in self._column_fields:
+                keys = self._column_match(field, expected)
+                if keys is not None:
+                    if not keys:
+                        return
+                    buckets.append(keys)
+                    continue
+            index = self._indexes.get(field)
+            if index is None:
+                residual[field] = expected
+                continue
+            try:
+                if not isinstance(expected, dict):
+                    bucket = index.get(expected)
+                elif list(expected) == ["$in"]:
+                    bucket = set().union(*(index.get(value, ()) for value in expected["$in"]))
+                else:
+                    residual[field] = expected
+                    continue
+            except TypeError:
+                residual[field] = expected
+                continue
+            if not bucket:
+                return
+            buckets.append(bucket)
+
+        if buckets:
+            buckets.sort(key=len)
+            keys = buckets[0].intersection(*buckets[1:])
+            candidates: Iterable[Tuple[int, Dict[str, Any]]] = [(key, self._docs[key]) for key in sorted(keys)]
+        else:
+            candidates = list(self._docs.items())
+
+        if not residual:
+            yield from candidates
+            return
+
+        prepared = _prepare_query(residual)
+        if self._row_type is not None and _query_paths(prepared) <= self._row_fields:
+            row_predicate = _compile_prepared(prepared, attributes=True)
+            rows = self._rows
+            for key, doc in candidates:
+                if row_predicate(rows[key]):
+                    yield key, doc
+            return
+
+        predicate = _compile_prepared(prepared)
+        for key, doc in candidates:
+            if predicate(doc):
+                yield key, doc
+
+    def _get_by_id(self, doc_id: Any) -> Optional[Dict[str, Any]]:
+        if self._by_id is None:
+            return next((doc for _, doc in self._select({"id": doc_id})), None)
+        try:
+            key = self._by_id.get(doc_id)
+        except TypeError:
+            return next((doc for _, doc in self._select({"id": doc_id})), None)
+        return None if key is None else self._docs[key]
+
+    async def find_one_by_id(self, doc_id: Any, projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        doc = self._get_by_id(doc_id)
+        return None if doc is None else _apply_projection(doc, _excluded_keys(projection))
 
     async def find_one(self, query: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
-        for doc in self.data:
-            if _matches(doc, query):
-                return _apply_projection(doc, projection)
+        if len(query) == 1 and "id" in query and not isinstance(query["id"], dict):
+            return await self.find_one_by_id(query["id"], projection)
+        for _, doc in self._select(query):
+            return _apply_projection(doc, _excluded_keys(projection))
         return None
 
     async def insert_one(self, document: Dict[str, Any]) -> None:
-        self.data.append(copy.deepcopy(document))
-
-    async def delete_one(self, query: Dict[str, Any]) -> None:
-        self.data = [doc for doc in self.data if not _matches(doc, query)]
-
-    async def delete_many(self, query: Dict[str, Any]) -> None:
-        self.data = [doc for doc in self.data if not _matches(doc, query)]
-
-    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any]) -> None:
-        for idx, doc in enumerate(self.data):
-            if _matches(doc, query):
-                if "$set" in update:
-                    new_doc = copy.deepcopy(doc)
-                    for key, value in update["$set"].items():
-                        new_doc[key] = value
-                    self.data[idx] = new_doc
-                return
+        self._store(_fast_clone(document))
+
+    def _remove(self, key: int, doc: Dict[str, Any]) -> None:
+        self._untrack(key, doc)
+        self._borrowed.discard(key)
+        del self._docs[key]
+        if self._columns is not None:
+            position = int(np.searchsorted(self._column_keys, key))
+            self._column_keys = np.delete(self._column_keys, position)
+            for field, column in self._columns.items():
+                self._columns[field] = np.delete(column, position)
+
+    async def delete_one(self, query: Dict[str, Any]) -> DeleteResult:
+        for key, doc in self._select(query):
+            self._remove(key, doc)
+            return DeleteResult(1)
+        return DeleteResult(0)
+
+    async def delete_many(self, query: Dict[str, Any]) -> DeleteResult:
+        matches = list(self._select(query))
+        for key, doc in matches:
+            self._remove(key, doc)
+        return DeleteResult(len(matches))
+
+    def _apply_set(self, key: int, doc: Dict[str, Any], changes: Dict[str, Any]) -> bool:
+        """Apply $set fields to a stored document; False if nothing changed."""
+        if not any(field not in doc or doc[field] != value for field, value in changes.items()):
+            return False
+        self._untrack(key, doc)
+        if key in self._borrowed:
+            self._borrowed.discard(key)
+            doc = self._docs[key] = doc.copy()
+        doc.update(changes)
+        self._track(key, doc)
+        # Writes that touch no column field (e.g. boost_expires_at) leave the cache alone.
+        if self._columns is not None and not self._column_roots.isdisjoint(changes):
+            self._column_write(int(np.searchsorted(self._column_keys, key)), doc)
+        return True
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        changes = update.get("$set", {})
+        for key, doc in self._select(query):
+            return UpdateResult(1, int(self._apply_set(key, doc, changes)))
+
+        if not upsert:
+            return UpdateResult(0, 0)
+        # As in Mongo, the new document starts from the query's equality fields.
+        document = {field: value for field, value in query.items() if not field.startswith("$") and not isinstance(value, dict)}
+        document.update(update.get("$setOnInsert", {}))
+        document.update(changes)
+        key = self._next_key
+        self._store(_fast_clone(document))
+        return UpdateResult(0, 0, key)
+
+    async def update_many(self, query: Dict[str, Any], update: Dict[str, Any]) -> UpdateResult:
+        changes = update.get("$set", {})
+        # Matches are collected first since each write re-indexes its document.
+        matches = list(self._select(query))
+        modified = sum(self._apply_set(key, doc, changes) for key, doc in matches)
+        return UpdateResult(len(matches), modified)
+
+    async def find_one_and_update(
+        self,
+        query: Dict[str, Any],
+        update: Dict[str, Any],
+        projection: Optional[Dict[str, int]] = None,
+        return_document: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """Update the first match; return_document=True (pymongo's ReturnDocument.AFTER) returns the new version."""
+        excluded = _excluded_keys(projection)
+        for key, doc in self._select(query):
+            before = None if return_document else _apply_projection(doc, excluded)
+            self._apply_set(key, doc, update.get("$set", {}))
+            return _apply_projection(self._docs[key], excluded) if return_document else before
+        return None
 
     async def count_documents(self, query: Dict[str, Any]) -> int:
-        return len([doc for doc in self.data if _matches(doc, query)])
+        return sum(1 for _ in self._select(query))
 
     def find(self, query: Dict[str, Any], projection: Optional[Dict[str, int]] = None) -> "FakeCursor":
-        filtered = [_apply_projection(doc, projection) for doc in self.data if _matches(doc, query)]
-        return FakeCursor(filtered)
+        return FakeCursor((doc for _, doc in self._select(query)), projection)
+
+    def _lookup_documents(self, docs: Iterable[Dict[str, Any]], spec: Dict[str, str]) -> Iterator[Dict[str, Any]]:
+        foreign = getattr(self.database, spec["from"])
+        for doc in docs:
+            query = {spec["foreignField"]: _get_value(doc, spec["localField"])}
+            yield {**doc, spec["as"]: [match for _, match in foreign._select(query)]}
+
+    async def aggregate(self, pipeline: List[Dict[str, Any]]) -> "FakeCursor":
+        """Run the pipeline stages the API uses; a leading $match uses the indexes, as does $lookup."""
+        stages = list(pipeline)
+        if stages and "$match" in stages[0]:
+            docs: Iterable[Dict[str, Any]] = (doc for _, doc in self._select(stages.pop(0)["$match"]))
+        else:
+            docs = list(self._docs.values())
+        for stage in stages:
+            (name, spec), = stage.items()
+            if name == "$match":
+                docs = filter(_compile_query(spec), docs)
+            elif name == "$addFields":
+                docs = [{**doc, **{field: _evaluate(expr, doc) for field, expr in spec.items()}} for doc in docs]
+            elif name == "$sort":
+                docs = _sort_documents(docs, spec)
+            elif name == "$limit":
+                docs = islice(docs, spec)
+            elif name == "$lookup":
+                docs = self._lookup_documents(docs, spec)
+            elif name == "$unwind":
+                docs = _unwind_documents(docs, spec)
+            elif name == "$replaceRoot":
+                docs = _replace_roots(docs, spec["newRoot"])
+            elif name == "$project" and not any(spec.values()):
+                docs = map(_apply_projection, docs, repeat(frozenset(spec)), repeat(False))
+            else:
+                raise NotImplementedError(f"Unsupported aggregation stage: {name}")
+        return FakeCursor(docs)
+
+
+class PropertyRow:
+    """Slot-backed copy of a property's top-level scalar fields, used only for matching."""
+
+    __slots__ = (
+        "id", "title", "description", "price", "currency", "location", "address",
+        "size_m2", "bedrooms", "bathrooms", "property_type", "furnished", "pets_allowed",
+        "parking", "balcony_garden", "energy_rating", "student_friendly", "availability_date",
+        "photos_count", "country", "city", "featured", "status", "created_at", "expires_at",
+        "boost_expires_at", "spotlight_expires_at",
+    )
+
+    def __init__(self, doc: Dict[str, Any]):
+        for field in self.__slots__:
+            setattr(self, field, doc.get(field))
 
 
 class InMemoryDB:
-    """Tiny drop-in replacement for motor's database object used in this app."""
+    """Tiny drop-in replacement for pymongo's async database object used in this app."""
 
-    def __init__(self, properties: List[Dict[str, Any]], plans: List[Dict[str, Any]]):
-        self.properties = FakeCollection(properties)
-        self.favorites = FakeCollection([])
-        self.sessions = FakeCollection([])
-        self.users = FakeCollection([])
+    def __init__(self, properties: Iterable[Dict[str, Any]], plans: Iterable[Dict[str, Any]]):
+        self.properties = FakeCollection(
+            properties,
+            indexes=("id", "country", "city", "property_type", "status", "agent_info.id"),
+            columns=("price", "size_m2", "bedrooms", "bathrooms"),
+            row_type=PropertyRow,
+        )
+        self.favorites = FakeCollection([], indexes=("id", "user_id", "property_id"))
+        self.sessions = FakeCollection([], indexes=("session_token",))
+        self.users = FakeCollection([], indexes=("id", "email"))
         self.viewing_requests = FakeCollection([])
-        self.plans = FakeCollection(plans)
+        self.plans = FakeCollection(plans, indexes=("id", "slug"))
+        for collection in (self.properties, self.favorites, self.sessions, self.users, self.viewing_requests, self.plans):
+            collection.database = self
 
-    def close(self) -> None:  # parity with AsyncIOMotorClient.close
+    def close(self) -> None:  # parity with MongoClient.close
         return None
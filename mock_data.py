@@ -1,6 +1,8 @@
+import random
 import uuid
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
 
 
 COUNTRY_LABELS = {
@@ -18,6 +20,8 @@ CITY_DATA = [
     {"city": "Berlin", "country": "DE", "lat": 52.52, "lng": 13.405, "currency": "EUR"},
     {"city": "Munich", "country": "DE", "lat": 48.1351, "lng": 11.582, "currency": "EUR"},
 ]
+# Derived once so renaming a country in COUNTRY_LABELS updates every location string.
+CITY_DATA = [{**city, "location": f"{city['city']}, {COUNTRY_LABELS[city['country']]}"} for city in CITY_DATA]
 
 AGENTS = [
     {"id": "agent-sarah", "name": "Sarah Johnson", "email": "sarah@homzy.com", "picture": "https://randomuser.me/api/portraits/women/1.jpg"},
@@ -44,7 +48,7 @@ PLAN_SEEDS = [
         "currency": "GBP",
         "max_active_listings": 1,
         "type": "individual",
-        "features": ["1 active listing", "15 day listing life", "3 photos", "Basic visibility"],
+        "features": ("1 active listing", "15 day listing life", "3 photos", "Basic visibility"),
     },
     {
         "id": "plan-standard",
@@ -54,7 +58,7 @@ PLAN_SEEDS = [
         "currency": "GBP",
         "max_active_listings": 3,
         "type": "individual",
-        "features": ["3 active listings", "60 day listing life", "15 photos", "Better ranking"],
+        "features": ("3 active listings", "60 day listing life", "15 photos", "Better ranking"),
     },
     {
         "id": "plan-agent-starter",
@@ -64,7 +68,7 @@ PLAN_SEEDS = [
         "currency": "GBP",
         "max_active_listings": 10,
         "type": "agent",
-        "features": ["Basic stats", "Agent profile badge"],
+        "features": ("Basic stats", "Agent profile badge"),
     },
     {
         "id": "plan-agent-pro",
@@ -74,7 +78,7 @@ PLAN_SEEDS = [
         "currency": "GBP",
         "max_active_listings": 30,
         "type": "agent",
-        "features": ["Higher visibility", "Pro Agent badge"],
+        "features": ("Higher visibility", "Pro Agent badge"),
     },
     {
         "id": "plan-agency-unlimited",
@@ -84,29 +88,42 @@ PLAN_SEEDS = [
         "currency": "GBP",
         "max_active_listings": 0,
         "type": "agent",
-        "features": ["Unlimited listings", "Team access", "Featured Agency badge"],
+        "features": ("Unlimited listings", "Team access", "Featured Agency badge"),
     },
 ]
 
 
-def _base_features(prop_type: str) -> List[str]:
-    shared = ["High-Speed WiFi", "Smart Thermostat", "Double Glazing"]
-    if prop_type == "flat":
-        return shared + ["Elevator Access", "Concierge"]
-    if prop_type == "house":
-        return shared + ["Private Garden", "Driveway"]
-    return shared + ["Compact Layout", "Co-working Desk"]
+_SHARED_FEATURES = ("High-Speed WiFi", "Smart Thermostat", "Double Glazing")
 
+# Read-only feature lists shared by every seeded property of the same type.
+_FEATURES_CACHE = {
+    "flat": _SHARED_FEATURES + ("Elevator Access", "Concierge"),
+    "house": _SHARED_FEATURES + ("Private Garden", "Driveway"),
+    "studio": _SHARED_FEATURES + ("Compact Layout", "Co-working Desk"),
+}
+
+PROPERTY_TYPES = ("flat", "house", "studio")
+
+_DESCRIPTIONS = {
+    (city_meta["city"], prop_type): f"Light-filled {prop_type} in {city_meta['city']} with modern finishes, close to transport and amenities."
+    for city_meta in CITY_DATA
+    for prop_type in PROPERTY_TYPES
+}
 
-def generate_seed_properties(count: int = 50) -> List[Dict[str, Any]]:
+
+def generate_seed_properties(count: int = 50, seed: int = 0) -> List[Dict[str, Any]]:
     """Create deterministic but varied seed data."""
+    rng = random.Random(seed)
     properties: List[Dict[str, Any]] = []
-    prop_types = ["flat", "house", "studio"]
     energy_ratings = ["A", "B", "C", None]
+    photo_slices = [PHOTOS[:3], PHOTOS[:4]]
+
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(days=90)
 
     for idx in range(count):
         city_meta = CITY_DATA[idx % len(CITY_DATA)]
-        prop_type = prop_types[idx % len(prop_types)]
+        prop_type = PROPERTY_TYPES[idx % len(PROPERTY_TYPES)]
         agent = AGENTS[idx % len(AGENTS)]
         energy = energy_ratings[idx % len(energy_ratings)]
 
@@ -116,20 +133,17 @@ def generate_seed_properties(count: int = 50) -> List[Dict[str, Any]]:
         price_base = 750 + (idx * 45)
         price = price_base if city_meta["currency"] == "EUR" else price_base * 0.78
 
-        availability_date = (datetime.now(timezone.utc) + timedelta(days=14 + idx)).date().isoformat()
-        now = datetime.now(timezone.utc)
-        expires_at = now + timedelta(days=90)
-
-        photos = PHOTOS[:3 + (idx % 2)]
+        availability_date = (now + timedelta(days=14 + idx)).date().isoformat()
+        photos = photo_slices[idx % 2]
 
         properties.append(
             {
-                "id": str(uuid.uuid4()),
+                "id": str(uuid.UUID(bytes=rng.randbytes(16), version=4)),
                 "title": f"{city_meta['city']} {prop_type.title()} #{idx + 1}",
-                "description": f"Light-filled {prop_type} in {city_meta['city']} with modern finishes, close to transport and amenities.",
+                "description": _DESCRIPTIONS[city_meta["city"], prop_type],
                 "price": round(price, 2),
                 "currency": city_meta["currency"],
-                "location": f"{city_meta['city']}, {COUNTRY_LABELS[city_meta['country']]}",
+                "location": city_meta["location"],
                 "address": f"{10 + idx} Main Street, {city_meta['city']}",
                 "coordinates": {"lat": city_meta["lat"], "lng": city_meta["lng"]},
                 "size_m2": size_m2,
@@ -146,13 +160,13 @@ def generate_seed_properties(count: int = 50) -> List[Dict[str, Any]]:
                 "photos": photos,
                 "photos_count": len(photos),
                 "agent_info": agent,
-                "features": _base_features(prop_type),
+                "features": _FEATURES_CACHE[prop_type],
                 "country": city_meta["country"],
                 "city": city_meta["city"],
                 "featured": idx < 8,
-                "created_at": now.isoformat(),
+                "created_at": now,
                 "status": "active",
-                "expires_at": expires_at.isoformat(),
+                "expires_at": expires_at,
                 "boost_expires_at": None,
                 "spotlight_expires_at": None,
             }
@@ -161,4 +175,11 @@ def generate_seed_properties(count: int = 50) -> List[Dict[str, Any]]:
     return properties
 
 
-PROPERTIES_DATA = generate_seed_properties()
+@lru_cache(maxsize=1)
+def get_properties_data(count: int = 50) -> Tuple[Dict[str, Any], ...]:
+    """Seed properties, generated on first use and shared read-only afterwards.
+
+    Every InMemoryDB built from this tuple references the same documents;
+    FakeCollection copies a document before its first update.
+    """
+    return tuple(generate_seed_properties(count))
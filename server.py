@@ -1,21 +1,23 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Response, Cookie, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Response, Cookie, Header, Query, Request
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, AsyncMongoClient, IndexModel, ReturnDocument
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
 import httpx
+import orjson
 import stripe
 from passlib.hash import bcrypt
 
 from in_memory_db import InMemoryDB
-from mock_data import PROPERTIES_DATA, PLAN_SEEDS
+from mock_data import get_properties_data, PLAN_SEEDS
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -32,6 +34,10 @@ STRIPE_PUBLIC_KEY = os.getenv('STRIPE_PUBLIC_KEY')
 PADDLE_VENDOR_ID = os.getenv('PADDLE_VENDOR_ID')
 PADDLE_API_KEY = os.getenv('PADDLE_API_KEY')
 PADDLE_PUBLIC_KEY = os.getenv('PADDLE_PUBLIC_KEY')
+REDIS_URL = os.getenv('REDIS_URL')
+SESSION_CACHE_TTL = 300
+EXPIRY_SWEEP_SECONDS = 60
+MAX_LISTINGS_PAGE = 1000
 CORS_ORIGINS = [
     origin.strip() for origin in (os.getenv('CORS_ORIGINS') or "http://localhost:3000,http://127.0.0.1:3000,https://homzy.site,https://www.homzy.site").split(",")
     if origin.strip()
@@ -39,24 +45,40 @@ CORS_ORIGINS = [
 
 client = None
 if not USE_IN_MEMORY_DB and MONGO_URL:
-    client = AsyncIOMotorClient(MONGO_URL)
+    client = AsyncMongoClient(MONGO_URL, tz_aware=True, maxPoolSize=100, minPoolSize=10)
     db = client[DB_NAME]
     DATA_SOURCE = "mongodb"
 else:
-    db = InMemoryDB(PROPERTIES_DATA, PLAN_SEEDS)
+    db = InMemoryDB(get_properties_data(), PLAN_SEEDS)
     DATA_SOURCE = "in-memory"
     USE_IN_MEMORY_DB = True
 
+# Shared so calls to the auth service reuse pooled keep-alive connections.
+auth_http_client = httpx.AsyncClient(
+    timeout=5.0,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    http2=True,
+)
+
+cache = None
+if REDIS_URL:
+    import redis.asyncio as aioredis
+    cache = aioredis.from_url(REDIS_URL)
+
 # UK + EU Country Whitelist (ISO 3166-1 alpha-2)
-ALLOWED_COUNTRIES = {
+ALLOWED_COUNTRIES = frozenset({
     'GB',  # United Kingdom
     # EU Members
     'AT', 'BE', 'BG', 'HR', 'CY', 'CZ', 'DK', 'EE', 'FI', 'FR', 
     'DE', 'GR', 'HU', 'IE', 'IT', 'LV', 'LT', 'LU', 'MT', 'NL', 
     'PL', 'PT', 'RO', 'SK', 'SI', 'ES', 'SE'
-}
+})
+# Built once for the country $in filter; treat as read-only.
+ALLOWED_COUNTRIES_LIST = sorted(ALLOWED_COUNTRIES)
 
-app = FastAPI()
+# Endpoints hand orjson (or jsonable_encoder) python-mode model dumps, so every
+# datetime goes out in the same ISO 8601 "+00:00" form.
+app = FastAPI(default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 
 stripe.api_key = STRIPE_SECRET_KEY or ""
@@ -222,38 +244,96 @@ class Plan(BaseModel):
     type: str
     features: list
 
+# Cache helpers (no-ops unless REDIS_URL is set)
+async def cache_get(key: str) -> Optional[dict]:
+    if cache is None:
+        return None
+    try:
+        raw = await cache.get(key)
+    except Exception:
+        logger.warning("Cache read failed for %s", key, exc_info=True)
+        return None
+    return orjson.loads(raw) if raw else None
+
+async def cache_set(key: str, value: dict, ttl: int):
+    if cache is None or ttl <= 0:
+        return
+    try:
+        await cache.set(key, orjson.dumps(value), ex=ttl)
+    except Exception:
+        logger.warning("Cache write failed for %s", key, exc_info=True)
+
+async def cache_delete(*keys: str):
+    if cache is None:
+        return
+    try:
+        await cache.delete(*keys)
+    except Exception:
+        logger.warning("Cache delete failed for %s", keys, exc_info=True)
+
 # Auth helpers
-async def get_current_user(session_token: Optional[str] = Cookie(None), authorization: Optional[str] = None):
-    token = session_token
-    if not token and authorization:
-        token = authorization.replace("Bearer ", "")
-    
+def as_datetime(value) -> datetime:
+    """Stored timestamps are BSON dates; rows written by older releases may still hold ISO strings."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def request_token(session_token: Optional[str], authorization: Optional[str]) -> Optional[str]:
+    """The session token from the cookie, else from an Authorization: Bearer header."""
+    return session_token or (authorization.removeprefix("Bearer ") if authorization else None)
+
+async def get_current_user(session_token: Optional[str] = Cookie(None), authorization: Optional[str] = Header(None)):
+    token = request_token(session_token, authorization)
+    # Anonymous requests stop here, before any cache or database work.
     if not token:
         return None
     
-    session = await db.sessions.find_one({"session_token": token})
-    if not session or datetime.fromisoformat(session["expires_at"]) < datetime.now(timezone.utc):
+    now = datetime.now(timezone.utc).timestamp()
+    session = await cache_get(f"sess:{token}")
+    if session is None:
+        session = await db.sessions.find_one({"session_token": token})
+        if not session:
+            return None
+        session = {"user_id": session["user_id"], "expires_at": int(as_datetime(session["expires_at"]).timestamp())}
+        await cache_set(f"sess:{token}", session, min(session["expires_at"] - int(now), SESSION_CACHE_TTL))
+    if session["expires_at"] < now:
         return None
     
-    user = await db.users.find_one({"id": session["user_id"]}, {"_id": 0})
-    return User(**user) if user else None
+    user = await cache_get(f"user:{session['user_id']}")
+    if user is None:
+        user = await db.users.find_one({"id": session["user_id"]}, {"_id": 0, "password_hash": 0})
+        if not user:
+            return None
+        await cache_set(f"user:{session['user_id']}", user, SESSION_CACHE_TTL)
+    return User(**user)
+
+# Plans are static configuration: loaded once, then served from memory.
+# Call load_plans() again after changing the plans collection.
+plans_by_id: Dict[str, Plan] = {}
+plans_by_slug: Dict[str, Plan] = {}
+
+async def load_plans():
+    plans = [Plan(**p) for p in await db.plans.find({}, {"_id": 0}).to_list(50)]
+    plans_by_id.clear()
+    plans_by_id.update((plan.id, plan) for plan in plans)
+    plans_by_slug.clear()
+    plans_by_slug.update((plan.slug, plan) for plan in plans)
 
 async def get_plan_by_id(plan_id: str) -> Plan:
-    plan = await db.plans.find_one({"id": plan_id}, {"_id": 0})
-    if not plan:
-        plan = await db.plans.find_one({"slug": "free"}, {"_id": 0})
-    return Plan(**plan)
+    if not plans_by_id:
+        await load_plans()
+    return plans_by_id.get(plan_id) or plans_by_slug["free"]
 
 async def get_plan_by_slug(slug: str) -> Optional[Plan]:
-    plan = await db.plans.find_one({"slug": slug}, {"_id": 0})
-    return Plan(**plan) if plan else None
+    if not plans_by_slug:
+        await load_plans()
+    return plans_by_slug.get(slug)
 
 async def count_active_listings(user: User) -> int:
-    listings = await db.properties.find({"agent_info.id": user.id, "status": "active"}, {"_id": 0}).to_list(10000)
-    return len(listings)
+    return await db.properties.count_documents({"agent_info.id": user.id, "status": "active"})
 
 async def enforce_plan_limits(user: User, photos: List[str]) -> dict:
-    plan = await get_plan_by_id(user.plan_id)
+    plan, active_count = await asyncio.gather(get_plan_by_id(user.plan_id), count_active_listings(user))
     limits = {
         "free": {"max_listings": 1, "max_photos": 3, "days": 15},
         "standard": {"max_listings": 3, "max_photos": 15, "days": 60},
@@ -262,7 +342,6 @@ async def enforce_plan_limits(user: User, photos: List[str]) -> dict:
         "agency-unlimited": {"max_listings": 0, "max_photos": 60, "days": 180},
     }
     rule = limits.get(plan.slug, limits["free"])
-    active_count = await count_active_listings(user)
     if rule["max_listings"] and active_count >= rule["max_listings"]:
         raise HTTPException(status_code=400, detail="You have reached the maximum number of active listings for your plan. Please upgrade your plan.")
     if len(photos) > rule["max_photos"]:
@@ -272,28 +351,21 @@ async def enforce_plan_limits(user: User, photos: List[str]) -> dict:
 def compute_expiry(rule_days: int) -> datetime:
     return datetime.now(timezone.utc) + timedelta(days=rule_days)
 
-def is_active(until: Optional[str]) -> bool:
-    if not until:
-        return False
-    dt = until if isinstance(until, datetime) else datetime.fromisoformat(until)
-    return dt > datetime.now(timezone.utc)
-
 def user_public(user: User) -> dict:
-    data = user.model_dump()
-    data.pop("password_hash", None)
-    return data
+    return user.model_dump(exclude={"password_hash"})
 
-async def create_session_for_user(user: User, response: Response, token: Optional[str] = None) -> str:
+async def create_session_for_user(user: User, response: Response, token: Optional[str] = None, new_user: Optional[dict] = None) -> str:
+    """`new_user` is a user document to insert alongside the session, for first logins."""
     session_token = token or str(uuid.uuid4())
     session = Session(
         user_id=user.id,
         session_token=session_token,
         expires_at=datetime.now(timezone.utc) + timedelta(days=7)
     )
-    session_dict = session.model_dump()
-    session_dict["created_at"] = session_dict["created_at"].isoformat()
-    session_dict["expires_at"] = session_dict["expires_at"].isoformat()
-    await db.sessions.insert_one(session_dict)
+    writes = [db.sessions.insert_one(session.model_dump())]
+    if new_user is not None:
+        writes.append(db.users.insert_one(new_user))
+    await asyncio.gather(*writes)
 
     response.set_cookie(
         key="session_token",
@@ -306,6 +378,12 @@ async def create_session_for_user(user: User, response: Response, token: Optiona
     )
     return session_token
 
+async def ownership_error(listing_id: str, action: str) -> HTTPException:
+    """Explain why a write filtered on listing id and owner matched nothing."""
+    if await db.properties.count_documents({"id": listing_id}):
+        return HTTPException(status_code=403, detail=f"You can only {action} your own listings")
+    return HTTPException(status_code=404, detail="Listing not found")
+
 def hash_password(raw: str) -> str:
     return bcrypt.hash(raw)
 
@@ -326,27 +404,25 @@ async def create_session(request: Request, response: Response):
     if not auth_session_url:
         raise HTTPException(status_code=501, detail="AUTH_SESSION_URL not configured")
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(auth_session_url, headers={"X-Session-ID": session_id})
-        if resp.status_code != 200:
-            raise HTTPException(status_code=401, detail="Invalid session")
-        data = resp.json()
+    resp = await auth_http_client.get(auth_session_url, headers={"X-Session-ID": session_id})
+    if resp.status_code != 200:
+        raise HTTPException(status_code=401, detail="Invalid session")
+    data = resp.json()
     
     existing_user = await db.users.find_one({"email": data["email"]}, {"_id": 0})
+    new_user = None
     if not existing_user:
         user = User(
             email=data["email"],
             name=data["name"],
             picture=data.get("picture")
         )
-        user_dict = user.model_dump()
-        user_dict["created_at"] = user_dict["created_at"].isoformat()
-        await db.users.insert_one(user_dict)
+        new_user = user.model_dump()
     else:
         user = User(**existing_user)
     
     session_token = data.get("session_token") or str(uuid.uuid4())
-    await create_session_for_user(user, response, token=session_token)
+    await create_session_for_user(user, response, token=session_token, new_user=new_user)
     return {"user": user_public(user), "session_token": session_token}
 
 @api_router.post("/auth/register")
@@ -357,9 +433,7 @@ async def register(payload: RegisterPayload, response: Response):
     user = User(email=payload.email, name=payload.name)
     user_dict = user.model_dump()
     user_dict["password_hash"] = hash_password(payload.password)
-    user_dict["created_at"] = user_dict["created_at"].isoformat()
-    await db.users.insert_one(user_dict)
-    await create_session_for_user(user, response)
+    await create_session_for_user(user, response, new_user=user_dict)
     return {"user": user_public(user)}
 
 @api_router.post("/auth/login")
@@ -377,25 +451,25 @@ async def dev_login(payload: DevLogin, response: Response):
         raise HTTPException(status_code=403, detail="Developer login disabled")
 
     existing_user = await db.users.find_one({"email": payload.email}, {"_id": 0})
+    new_user = None
     if not existing_user:
         user = User(
             email=payload.email,
             name=payload.name,
             picture=payload.picture
         )
-        user_dict = user.model_dump()
-        user_dict["created_at"] = user_dict["created_at"].isoformat()
-        await db.users.insert_one(user_dict)
+        new_user = user.model_dump()
     else:
         user = User(**existing_user)
 
-    session_token = await create_session_for_user(user, response)
+    session_token = await create_session_for_user(user, response, new_user=new_user)
     return {"user": user_public(user), "session_token": session_token, "source": DATA_SOURCE}
 
-@api_router.get("/plans", response_model=List[Plan])
+@api_router.get("/plans", responses={200: {"model": List[Plan]}})
 async def list_plans():
-    plans = await db.plans.find({}, {"_id": 0}).to_list(50)
-    return [Plan(**p) for p in plans]
+    if not plans_by_id:
+        await load_plans()
+    return ORJSONResponse([plan.model_dump(mode="json") for plan in plans_by_id.values()])
 
 @api_router.post("/plans/subscribe")
 async def subscribe_plan(plan_slug: str, user: Optional[User] = Depends(get_current_user)):
@@ -407,17 +481,17 @@ async def subscribe_plan(plan_slug: str, user: Optional[User] = Depends(get_curr
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
     await db.users.update_one({"id": user.id}, {"$set": {"plan_id": plan.id, "role": "agent" if plan.type == "agent" else "individual"}})
-    updated = await db.users.find_one({"id": user.id}, {"_id": 0})
-    return {"message": "Plan updated", "user": updated, "plan": plan.model_dump()}
+    await cache_delete(f"user:{user.id}")
+    updated = await db.users.find_one({"id": user.id}, {"_id": 0, "password_hash": 0})
+    return {"message": "Plan updated", "user": updated, "plan": plan.model_dump(mode="json")}
 
 @api_router.get("/me/usage")
 async def get_usage(user: Optional[User] = Depends(get_current_user)):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    plan = await get_plan_by_id(user.plan_id)
-    active = await count_active_listings(user)
+    plan, active = await asyncio.gather(get_plan_by_id(user.plan_id), count_active_listings(user))
     return {
-        "plan": plan.model_dump(),
+        "plan": plan.model_dump(mode="json"),
         "active_listings": active,
         "max_active_listings": plan.max_active_listings
     }
@@ -429,14 +503,16 @@ async def get_me(user: Optional[User] = Depends(get_current_user)):
     return {"user": user_public(user)}
 
 @api_router.post("/auth/logout")
-async def logout(response: Response, user: Optional[User] = Depends(get_current_user), session_token: Optional[str] = Cookie(None)):
-    if session_token:
-        await db.sessions.delete_one({"session_token": session_token})
+async def logout(response: Response, session_token: Optional[str] = Cookie(None), authorization: Optional[str] = Header(None)):
+    token = request_token(session_token, authorization)
+    if token:
+        await db.sessions.delete_one({"session_token": token})
+        await cache_delete(f"sess:{token}")
     response.delete_cookie("session_token", path="/")
     return {"message": "Logged out"}
 
 # Property endpoints
-@api_router.get("/properties", response_model=List[Property])
+@api_router.get("/properties", responses={200: {"model": List[Property]}})
 async def get_properties(
     location: Optional[str] = None,
     min_price: Optional[float] = None,
@@ -452,11 +528,11 @@ async def get_properties(
     energy_rating: Optional[str] = None,
     featured: Optional[bool] = None,
     student_friendly: Optional[bool] = None,
-    limit: int = 50
+    # $limit must be positive, so out-of-range values are rejected up front.
+    limit: int = Query(50, ge=1, le=MAX_LISTINGS_PAGE)
 ):
     # Force filter to only allowed countries
-    query = {"country": {"$in": list(ALLOWED_COUNTRIES)}}
-    await expire_outdated_listings()
+    query = {"country": {"$in": ALLOWED_COUNTRIES_LIST}}
     
     if location:
         query["$or"] = [
@@ -490,34 +566,34 @@ async def get_properties(
         query["featured"] = featured
     if student_friendly is not None:
         query["student_friendly"] = student_friendly
-    # Only active listings
+    # Only active listings; expires_at also hides listings the sweeper has not reached yet
+    now = datetime.now(timezone.utc)
     query["status"] = "active"
+    query["expires_at"] = {"$gt": now}
 
-    properties = await db.properties.find(query, {"_id": 0}).to_list(10000)
     # ranking: spotlight > boost > featured > created_at desc
-    def sort_key(prop):
-        return (
-            0 if is_active(prop.get("spotlight_expires_at")) else 1,
-            0 if is_active(prop.get("boost_expires_at")) else 1,
-            0 if prop.get("featured") else 1,
-            -(prop.get("created_at").timestamp() if isinstance(prop.get("created_at"), datetime) else datetime.fromisoformat(str(prop.get("created_at"))).timestamp())
-        )
-    properties = sorted(properties, key=sort_key)[:limit]
-    for prop in properties:
-        if isinstance(prop.get("created_at"), str):
-            prop["created_at"] = datetime.fromisoformat(prop["created_at"])
-    return properties
-
-@api_router.get("/properties/{property_id}", response_model=Property)
+    pipeline = [
+        {"$match": query},
+        {"$addFields": {
+            "_spot": {"$cond": [{"$gt": ["$spotlight_expires_at", now]}, 0, 1]},
+            "_boost": {"$cond": [{"$gt": ["$boost_expires_at", now]}, 0, 1]},
+            "_feat": {"$cond": [{"$eq": ["$featured", True]}, 0, 1]},
+        }},
+        {"$sort": {"_spot": 1, "_boost": 1, "_feat": 1, "created_at": -1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "_spot": 0, "_boost": 0, "_feat": 0}},
+    ]
+    cursor = await db.properties.aggregate(pipeline)
+    return ORJSONResponse(await cursor.to_list(limit))
+
+@api_router.get("/properties/{property_id}", responses={200: {"model": Property}})
 async def get_property(property_id: str):
     prop = await db.properties.find_one({"id": property_id}, {"_id": 0})
     if not prop:
         raise HTTPException(status_code=404, detail="Property not found")
-    if isinstance(prop.get("created_at"), str):
-        prop["created_at"] = datetime.fromisoformat(prop["created_at"])
-    return Property(**prop)
+    return ORJSONResponse(Property.model_construct(**prop).model_dump())
 
-@api_router.post("/properties", response_model=Property)
+@api_router.post("/properties", responses={200: {"model": Property}})
 async def create_property(prop_data: PropertyCreate, user: Optional[User] = Depends(get_current_user)):
     if not user:
         raise HTTPException(status_code=401, detail="Authentication required")
@@ -554,37 +630,22 @@ async def create_property(prop_data: PropertyCreate, user: Optional[User] = Depe
         photos_count=len(prop_data.photos),
         expires_at=compute_expiry(rule["days"])
     )
-    prop_dict = prop.model_dump()
-    prop_dict["created_at"] = prop_dict["created_at"].isoformat()
-    if prop_dict.get("expires_at"):
-        prop_dict["expires_at"] = prop_dict["expires_at"].isoformat()
-    await db.properties.insert_one(prop_dict)
-    return prop
-
-@api_router.get("/me/listings", response_model=List[Property])
+    await db.properties.insert_one(prop.model_dump())
+    return ORJSONResponse(prop.model_dump())
+
+@api_router.get("/me/listings", responses={200: {"model": List[Property]}})
 async def get_my_listings(user: Optional[User] = Depends(get_current_user)):
     if not user:
         raise HTTPException(status_code=401, detail="Authentication required")
     
-    properties = await db.properties.find({"agent_info.id": user.id}, {"_id": 0}).to_list(1000)
-    for prop in properties:
-        if isinstance(prop.get("created_at"), str):
-            prop["created_at"] = datetime.fromisoformat(prop["created_at"])
-    return properties
+    cursor = db.properties.find({"agent_info.id": user.id}, {"_id": 0}).sort("created_at", -1).limit(MAX_LISTINGS_PAGE).batch_size(500)
+    return ORJSONResponse(await cursor.to_list(MAX_LISTINGS_PAGE))
 
-@api_router.put("/listings/{listing_id}", response_model=Property)
+@api_router.put("/listings/{listing_id}", responses={200: {"model": Property}})
 async def update_listing(listing_id: str, prop_data: PropertyUpdate, user: Optional[User] = Depends(get_current_user)):
     if not user:
         raise HTTPException(status_code=401, detail="Authentication required")
     
-    # Check ownership
-    existing = await db.properties.find_one({"id": listing_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Listing not found")
-    
-    if existing["agent_info"]["id"] != user.id:
-        raise HTTPException(status_code=403, detail="You can only edit your own listings")
-    
     # Validate country if being updated
     if prop_data.country and prop_data.country not in ALLOWED_COUNTRIES:
         raise HTTPException(
@@ -596,28 +657,24 @@ async def update_listing(listing_id: str, prop_data: PropertyUpdate, user: Optio
     update_dict = {k: v for k, v in prop_data.model_dump(exclude_unset=True).items() if v is not None}
     if "photos" in update_dict:
         update_dict["photos_count"] = len(update_dict["photos"])
+    # The owner is part of the filter, so the write doubles as the ownership check
+    owned = {"id": listing_id, "agent_info.id": user.id}
     if update_dict:
-        await db.properties.update_one({"id": listing_id}, {"$set": update_dict})
-    
-    updated = await db.properties.find_one({"id": listing_id}, {"_id": 0})
-    if isinstance(updated.get("created_at"), str):
-        updated["created_at"] = datetime.fromisoformat(updated["created_at"])
-    return Property(**updated)
+        updated = await db.properties.find_one_and_update(owned, {"$set": update_dict}, {"_id": 0}, return_document=ReturnDocument.AFTER)
+    else:
+        updated = await db.properties.find_one(owned, {"_id": 0})
+    if not updated:
+        raise await ownership_error(listing_id, "edit")
+    return ORJSONResponse(Property.model_construct(**updated).model_dump())
 
 @api_router.delete("/listings/{listing_id}")
 async def delete_listing(listing_id: str, user: Optional[User] = Depends(get_current_user)):
     if not user:
         raise HTTPException(status_code=401, detail="Authentication required")
     
-    # Check ownership
-    existing = await db.properties.find_one({"id": listing_id})
-    if not existing:
-        raise HTTPException(status_code=404, detail="Listing not found")
-    
-    if existing["agent_info"]["id"] != user.id:
-        raise HTTPException(status_code=403, detail="You can only delete your own listings")
-    
-    await db.properties.delete_one({"id": listing_id})
+    result = await db.properties.delete_one({"id": listing_id, "agent_info.id": user.id})
+    if not result.deleted_count:
+        raise await ownership_error(listing_id, "delete")
     await db.favorites.delete_many({"property_id": listing_id})
     return {"message": "Listing deleted successfully"}
 
@@ -626,56 +683,51 @@ async def delete_listing(listing_id: str, user: Optional[User] = Depends(get_cur
 async def boost_listing(listing_id: str, user: Optional[User] = Depends(get_current_user)):
     if not user:
         raise HTTPException(status_code=401, detail="Authentication required")
-    listing = await db.properties.find_one({"id": listing_id})
-    if not listing:
-        raise HTTPException(status_code=404, detail="Listing not found")
-    if listing["agent_info"]["id"] != user.id:
-        raise HTTPException(status_code=403, detail="You can only boost your own listings")
     boost_until = datetime.now(timezone.utc) + timedelta(days=7)
-    await db.properties.update_one({"id": listing_id}, {"$set": {"boost_expires_at": boost_until.isoformat()}})
+    result = await db.properties.update_one({"id": listing_id, "agent_info.id": user.id}, {"$set": {"boost_expires_at": boost_until}})
+    if not result.matched_count:
+        raise await ownership_error(listing_id, "boost")
     return {"message": "Listing boosted", "boost_expires_at": boost_until.isoformat()}
 
 @api_router.post("/listings/{listing_id}/spotlight")
 async def spotlight_listing(listing_id: str, user: Optional[User] = Depends(get_current_user)):
     if not user:
         raise HTTPException(status_code=401, detail="Authentication required")
-    listing = await db.properties.find_one({"id": listing_id})
-    if not listing:
-        raise HTTPException(status_code=404, detail="Listing not found")
-    if listing["agent_info"]["id"] != user.id:
-        raise HTTPException(status_code=403, detail="You can only spotlight your own listings")
     until = datetime.now(timezone.utc) + timedelta(days=7)
-    await db.properties.update_one({"id": listing_id}, {"$set": {"spotlight_expires_at": until.isoformat(), "featured": True}})
+    result = await db.properties.update_one({"id": listing_id, "agent_info.id": user.id}, {"$set": {"spotlight_expires_at": until, "featured": True}})
+    if not result.matched_count:
+        raise await ownership_error(listing_id, "spotlight")
     return {"message": "Listing spotlighted", "spotlight_expires_at": until.isoformat()}
 
 # Favorites
-@api_router.get("/favorites", response_model=List[Property])
+@api_router.get("/favorites", responses={200: {"model": List[Property]}})
 async def get_favorites(user: Optional[User] = Depends(get_current_user)):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    favorites = await db.favorites.find({"user_id": user.id}, {"_id": 0}).to_list(1000)
-    property_ids = [f["property_id"] for f in favorites]
-    
-    properties = await db.properties.find({"id": {"$in": property_ids}}, {"_id": 0}).to_list(1000)
-    for prop in properties:
-        if isinstance(prop.get("created_at"), str):
-            prop["created_at"] = datetime.fromisoformat(prop["created_at"])
-    return properties
+    pipeline = [
+        {"$match": {"user_id": user.id}},
+        {"$limit": MAX_LISTINGS_PAGE},
+        {"$lookup": {"from": "properties", "localField": "property_id", "foreignField": "id", "as": "property"}},
+        {"$unwind": "$property"},
+        {"$replaceRoot": {"newRoot": "$property"}},
+        {"$project": {"_id": 0}},
+    ]
+    cursor = await db.favorites.aggregate(pipeline)
+    return ORJSONResponse(await cursor.to_list(MAX_LISTINGS_PAGE))
 
 @api_router.post("/favorites/{property_id}")
 async def add_favorite(property_id: str, user: Optional[User] = Depends(get_current_user)):
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
-    existing = await db.favorites.find_one({"user_id": user.id, "property_id": property_id})
-    if existing:
+    result = await db.favorites.update_one(
+        {"user_id": user.id, "property_id": property_id},
+        {"$setOnInsert": Favorite(user_id=user.id, property_id=property_id).model_dump()},
+        upsert=True
+    )
+    if result.upserted_id is None:
         return {"message": "Already in favorites"}
-    
-    favorite = Favorite(user_id=user.id, property_id=property_id)
-    fav_dict = favorite.model_dump()
-    fav_dict["created_at"] = fav_dict["created_at"].isoformat()
-    await db.favorites.insert_one(fav_dict)
     return {"message": "Added to favorites"}
 
 @api_router.delete("/favorites/{property_id}")
@@ -693,9 +745,7 @@ async def create_viewing_request(data: ViewingRequestCreate, user: Optional[User
         **data.model_dump(),
         user_id=user.id if user else "guest"
     )
-    viewing_dict = viewing.model_dump()
-    viewing_dict["created_at"] = viewing_dict["created_at"].isoformat()
-    await db.viewing_requests.insert_one(viewing_dict)
+    await db.viewing_requests.insert_one(viewing.model_dump())
     return {"message": "Viewing request submitted"}
 
 # Stripe checkout mock/real
@@ -792,13 +842,20 @@ async def stripe_webhook(request: Request):
     if not user_id:
         return {"status": "ignored"}
 
-    if metadata.get("purpose") == "plan" and metadata.get("plan_slug"):
-        await db.users.update_one({"id": user_id}, {"$set": {"plan_id": f"plan-{metadata['plan_slug']}"}})
+    # Plan and addon updates touch different collections, so they run concurrently
+    addon_until = datetime.now(timezone.utc) + timedelta(days=7)
+    plan_changed = metadata.get("purpose") == "plan" and bool(metadata.get("plan_slug"))
+    writes = []
+    if plan_changed:
+        writes.append(db.users.update_one({"id": user_id}, {"$set": {"plan_id": f"plan-{metadata['plan_slug']}"}}))
     if metadata.get("purpose") == "addon" and metadata.get("listing_id"):
         if metadata.get("addon") == "boost":
-            await db.properties.update_one({"id": metadata["listing_id"]}, {"$set": {"boost_expires_at": (datetime.now(timezone.utc) + timedelta(days=7)).isoformat()}})
+            writes.append(db.properties.update_one({"id": metadata["listing_id"]}, {"$set": {"boost_expires_at": addon_until}}))
         if metadata.get("addon") == "spotlight":
-            await db.properties.update_one({"id": metadata["listing_id"]}, {"$set": {"spotlight_expires_at": (datetime.now(timezone.utc) + timedelta(days=7)).isoformat(), "featured": True}})
+            writes.append(db.properties.update_one({"id": metadata["listing_id"]}, {"$set": {"spotlight_expires_at": addon_until, "featured": True}}))
+    await asyncio.gather(*writes)
+    if plan_changed:
+        await cache_delete(f"user:{user_id}")
     return {"status": "ok"}
 
 # Maintenance
@@ -866,16 +923,99 @@ logger = logging.getLogger(__name__)
 logger.info("API data source: %s", DATA_SOURCE)
 
 async def expire_outdated_listings():
-    now = datetime.now(timezone.utc)
-    listings = await db.properties.find({}, {"_id": 0}).to_list(10000)
-    for lst in listings:
-        expires = lst.get("expires_at")
-        if expires and isinstance(expires, str):
-            expires = datetime.fromisoformat(expires)
-        if expires and expires < now and lst.get("status") != "expired":
-            await db.properties.update_one({"id": lst["id"]}, {"$set": {"status": "expired"}})
+    await db.properties.update_many(
+        {"expires_at": {"$lt": datetime.now(timezone.utc)}, "status": {"$ne": "expired"}},
+        {"$set": {"status": "expired"}},
+    )
+
+async def expire_listings_periodically():
+    while True:
+        try:
+            await expire_outdated_listings()
+        except Exception:
+            logger.exception("Listing expiry sweep failed")
+        await asyncio.sleep(EXPIRY_SWEEP_SECONDS)
+
+DB_INDEXES = {
+    "properties": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING), ("country", ASCENDING), ("price", ASCENDING)]),
+        IndexModel([("agent_info.id", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("expires_at", ASCENDING), ("status", ASCENDING)]),
+    ],
+    "sessions": [IndexModel([("session_token", ASCENDING)], unique=True)],
+    "favorites": [IndexModel([("user_id", ASCENDING), ("property_id", ASCENDING)], unique=True)],
+}
+
+async def ensure_index(name: str, index: IndexModel):
+    # One call per index: a failed build (e.g. a unique index over duplicates) leaves the others in place.
+    try:
+        await db[name].create_indexes([index])
+    except Exception:
+        logger.exception("Creating index %s on %s failed", index.document["name"], name)
+
+async def ensure_indexes():
+    await asyncio.gather(*(ensure_index(name, index) for name, indexes in DB_INDEXES.items() for index in indexes))
+
+# Fields that older releases stored as ISO strings; BSON dates keep range
+# filters like the expiry sweep index-friendly and free of per-row parsing.
+STRING_TIMESTAMP_FIELDS = {
+    "properties": ("created_at", "expires_at", "boost_expires_at", "spotlight_expires_at"),
+    "sessions": ("created_at", "expires_at"),
+    "users": ("created_at",),
+    "favorites": ("created_at",),
+    "viewing_requests": ("created_at",),
+}
+
+async def migrate_string_timestamps():
+    """Convert leftover string timestamps to dates in place; a no-op once migrated."""
+    await asyncio.gather(*(
+        db[name].update_many(
+            {"$or": [{field: {"$type": "string"}} for field in fields]},
+            [{"$set": {
+                field: {"$cond": [{"$eq": [{"$type": f"${field}"}, "string"]}, {"$toDate": f"${field}"}, f"${field}"]}
+                for field in fields
+            }}],
+        )
+        for name, fields in STRING_TIMESTAMP_FIELDS.items()
+    ))
+
+@app.on_event("startup")
+async def migrate_db_timestamps():
+    # Seed data for InMemoryDB is generated with native datetimes.
+    if USE_IN_MEMORY_DB:
+        return
+    try:
+        await migrate_string_timestamps()
+    except Exception:
+        logger.exception("Timestamp migration failed")
+
+@app.on_event("startup")
+async def create_db_indexes():
+    # InMemoryDB declares its indexes when the collections are built.
+    if USE_IN_MEMORY_DB:
+        return
+    await ensure_indexes()
+
+@app.on_event("startup")
+async def warm_plan_cache():
+    # get_plan_by_id/get_plan_by_slug load the plans on first use if this fails.
+    try:
+        await load_plans()
+    except Exception:
+        logger.warning("Plan cache warm-up failed", exc_info=True)
+
+@app.on_event("startup")
+async def start_expiry_sweeper():
+    app.state.expiry_task = asyncio.create_task(expire_listings_periodically())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    expiry_task = getattr(app.state, "expiry_task", None)
+    if expiry_task is not None:
+        expiry_task.cancel()
     if client:
-        client.close()
+        await client.close()
+    if cache is not None:
+        await cache.aclose()
+    await auth_http_client.aclose()
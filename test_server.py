@@ -1,12 +1,17 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 import uuid
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
 from datetime import datetime, timezone
+import numpy as np
+import orjson
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Mock data
 mock_properties = [
@@ -81,6 +86,88 @@ mock_properties = [
     }
 ]
 
+# Low-cardinality string fields are stored as small integer codes; a filter
+# value is translated once per query and compared as an int.
+category_codes: Dict[str, Dict[str, int]] = {"country": {}, "property_type": {}}
+
+def _intern_column(field: str) -> np.ndarray:
+    codes = category_codes[field]
+    return np.array([codes.setdefault(p[field], len(codes)) for p in mock_properties], dtype=np.int32)
+
+# Column-oriented copy of mock_properties: filters become vectorised masks over
+# these arrays; matching row positions index back into mock_properties.
+property_columns = {
+    "price": np.array([p["price"] for p in mock_properties], dtype=np.float64),
+    "bedrooms": np.array([p["bedrooms"] for p in mock_properties], dtype=np.int64),
+    "bathrooms": np.array([p["bathrooms"] for p in mock_properties], dtype=np.int64),
+    "property_type": _intern_column("property_type"),
+    "furnished": np.array([p["furnished"] for p in mock_properties], dtype=bool),
+    "pets_allowed": np.array([p["pets_allowed"] for p in mock_properties], dtype=bool),
+    "parking": np.array([p["parking"] for p in mock_properties], dtype=bool),
+    "balcony_garden": np.array([p["balcony_garden"] for p in mock_properties], dtype=bool),
+    "country": _intern_column("country"),
+    "featured": np.array([p["featured"] for p in mock_properties], dtype=bool),
+}
+
+# All lowercased locations joined into one NUL-separated text, so a substring
+# filter is a sequence of C-level str.find calls instead of a per-row search.
+location_text = "\x00".join(p["location"].lower() for p in mock_properties)
+location_starts = [0, *accumulate(len(p["location"].lower()) + 1 for p in mock_properties[:-1])]
+
+# Sorted price index: a range filter is two binary searches plus one scatter of
+# the row positions in between.
+price_order = np.argsort(property_columns["price"], kind="stable")
+sorted_prices = property_columns["price"][price_order]
+
+def _cannot_match(country: Optional[str], property_type: Optional[str],
+                  min_price: Optional[float], max_price: Optional[float]) -> bool:
+    """True when a filter rules out every property without touching any row."""
+    if country and country not in category_codes["country"]:
+        return True
+    if property_type and property_type not in category_codes["property_type"]:
+        return True
+    if len(sorted_prices) and (
+        (min_price is not None and min_price > sorted_prices[-1])
+        or (max_price is not None and max_price < sorted_prices[0])
+        or (min_price is not None and max_price is not None and min_price > max_price)
+    ):
+        return True
+    return False
+
+def price_mask(min_price: Optional[float], max_price: Optional[float]) -> np.ndarray:
+    """Rows priced within the inclusive bounds; a None bound is open."""
+    mask = np.zeros(len(mock_properties), dtype=bool)
+    if (min_price is not None and min_price != min_price) or (max_price is not None and max_price != max_price):
+        return mask  # NaN bounds match nothing, as the plain comparisons did
+    lo = 0 if min_price is None else np.searchsorted(sorted_prices, min_price, "left")
+    hi = len(sorted_prices) if max_price is None else np.searchsorted(sorted_prices, max_price, "right")
+    mask[price_order[lo:hi]] = True
+    return mask
+
+def location_mask(needle: str) -> np.ndarray:
+    """Rows whose lowercased location contains the already-lowercased needle."""
+    mask = np.zeros(len(mock_properties), dtype=bool)
+    if "\x00" in needle:  # would match across a row boundary
+        return mask
+    position = location_text.find(needle)
+    while position >= 0:
+        row = bisect_right(location_starts, position) - 1
+        mask[row] = True
+        if row + 1 == len(location_starts):
+            break
+        # One hit per row is enough; resume at the next location.
+        position = location_text.find(needle, location_starts[row + 1])
+    return mask
+
+# Inverted index for the categorical and boolean fields: one precomputed row mask
+# per (field, value), so those filters are an AND of cached bitsets.
+value_masks: Dict[Tuple[str, object], np.ndarray] = {
+    **{(field, code): property_columns[field] == code
+       for field in ("country", "property_type") for code in category_codes[field].values()},
+    **{(field, flag): property_columns[field] == flag
+       for field in ("furnished", "pets_allowed", "parking", "balcony_garden", "featured") for flag in (False, True)},
+}
+
 # Models
 class Property(BaseModel):
     id: str
@@ -109,6 +196,12 @@ class Property(BaseModel):
     agent_info: dict
     created_at: str
 
+PROP_BY_ID = {p["id"]: p for p in mock_properties}
+# Each property serialized once through the model, parallel to mock_properties, so
+# responses are assembled from these bytes without encoding anything per request.
+ROW_JSON = [orjson.dumps(Property(**p).model_dump()) for p in mock_properties]
+PROP_JSON = {p["id"]: body for p, body in zip(mock_properties, ROW_JSON)}
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -122,7 +215,110 @@ app.add_middleware(
 async def root():
     return {"message": "Homzy API is running!"}
 
-@app.get("/api/properties", response_model=List[Property])
+# Mask expression per filter, in evaluation order: cheap equality checks first
+# and the substring match last, so an empty mask stops the pass early.
+_FILTER_TESTS = (
+    ("country", 'value_masks["country", country]'),
+    ("property_type", 'value_masks["property_type", property_type]'),
+    ("bedrooms", 'cols["bedrooms"] == bedrooms'),
+    ("bathrooms", 'cols["bathrooms"] == bathrooms'),
+    ("furnished", 'value_masks["furnished", furnished]'),
+    ("pets_allowed", 'value_masks["pets_allowed", pets_allowed]'),
+    ("parking", 'value_masks["parking", parking]'),
+    ("balcony_garden", 'value_masks["balcony_garden", balcony_garden]'),
+    ("featured", 'value_masks["featured", featured]'),
+    ("price", 'price_mask(*price)'),
+    ("location", 'location_mask(location)'),
+)
+
+@lru_cache(maxsize=256)
+def _mask_factory(active: Tuple[str, ...]) -> Callable[..., Optional[np.ndarray]]:
+    """Generate a mask function for one non-empty set of active filters, taking their values in order.
+
+    Returns None from the generated function once no row survives.
+    """
+    tests = dict(_FILTER_TESTS)
+    lines = []
+    for name in active:
+        if lines:
+            lines.append(f"mask &= {tests[name]}")
+        else:  # the first mask may be a shared value_masks entry, so never update it in place
+            lines.append(f"mask = {tests[name]}.copy()" if tests[name].startswith("value_masks") else f"mask = {tests[name]}")
+        lines.append("if not mask.any(): return None")
+    lines.append("return mask")
+    source = f"def _mask({', '.join(active)}):\n" + "".join(f"    {line}\n" for line in lines)
+    namespace = {
+        "cols": property_columns, "value_masks": value_masks, "price_mask": price_mask, "location_mask": location_mask,
+    }
+    exec(source, namespace)
+    return namespace["_mask"]
+
+# Results longer than this are streamed in batches instead of being joined and
+# cached whole, which bounds both the per-request allocation and the caches.
+STREAM_MIN_ROWS = 500
+STREAM_BATCH_ROWS = 100
+NO_ROWS = np.empty(0, dtype=np.intp)
+
+@lru_cache(maxsize=1024)
+def _matching_rows(key: tuple) -> np.ndarray:
+    """Row positions for one query signature with at least one active filter."""
+    (location, min_price, max_price, bedrooms, bathrooms, property_type, furnished,
+     pets_allowed, parking, balcony_garden, country, featured, limit) = key
+    values = {
+        "country": None,
+        "property_type": None,
+        "bedrooms": bedrooms,
+        "bathrooms": bathrooms,
+        "furnished": furnished,
+        "pets_allowed": pets_allowed,
+        "parking": parking,
+        "balcony_garden": balcony_garden,
+        "featured": featured,
+        "price": None if min_price is None and max_price is None else (min_price, max_price),
+        # Empty strings disable a filter just like None does.
+        "location": location.lower() if location else None,
+    }
+    # get_properties has already rejected values no property has.
+    for field, value in (("country", country), ("property_type", property_type)):
+        if value:
+            values[field] = category_codes[field][value]
+    active = tuple(name for name, _ in _FILTER_TESTS if values[name] is not None)
+    mask = _mask_factory(active)(*(values[name] for name in active))
+    if mask is None:
+        return NO_ROWS
+    return np.flatnonzero(mask)[:limit]
+
+def _encode_rows(rows: Sequence[int]) -> bytes:
+    return b"[" + b",".join(map(ROW_JSON.__getitem__, rows)) + b"]"
+
+def _stream_rows(rows: Sequence[int]) -> Iterator[bytes]:
+    """Emit the JSON array in batches, joining each batch only when it is sent."""
+    yield b"["
+    for start in range(0, len(rows), STREAM_BATCH_ROWS):
+        batch = b",".join(map(ROW_JSON.__getitem__, rows[start:start + STREAM_BATCH_ROWS]))
+        yield batch if start == 0 else b"," + batch
+    yield b"]"
+
+@lru_cache(maxsize=1024)
+def _compute(key: tuple) -> bytes:
+    """JSON body for a filtered query whose result is small enough to cache."""
+    return _encode_rows(_matching_rows(key))
+
+# The whole unfiltered listing, built once: the response for any limit that
+# covers every property.
+CANONICAL_BYTES = _encode_rows(range(len(mock_properties)))
+
+# Unfiltered bodies keyed by how many leading properties they hold; anything over
+# STREAM_MIN_ROWS is streamed, so at most STREAM_MIN_ROWS + 1 entries exist.
+_DEFAULT_CACHE: Dict[int, bytes] = {}
+
+def _default_body(count: int) -> bytes:
+    body = _DEFAULT_CACHE.get(count)
+    if body is None:
+        body = _DEFAULT_CACHE[count] = _encode_rows(range(count))
+    return body
+
+@app.get("/api/properties", response_model=None, responses={200: {"model": List[Property]}})
 async def get_properties(
     location: Optional[str] = None,
     min_price: Optional[float] = None,
@@ -138,42 +334,33 @@ async def get_properties(
     featured: Optional[bool] = None,
     limit: int = 50
 ):
-    properties = mock_properties.copy()
-    
-    # Apply filters
-    if location:
-        properties = [p for p in properties if location.lower() in p["location"].lower()]
-    if min_price is not None:
-        properties = [p for p in properties if p["price"] >= min_price]
-    if max_price is not None:
-        properties = [p for p in properties if p["price"] <= max_price]
-    if bedrooms is not None:
-        properties = [p for p in properties if p["bedrooms"] == bedrooms]
-    if bathrooms is not None:
-        properties = [p for p in properties if p["bathrooms"] == bathrooms]
-    if property_type:
-        properties = [p for p in properties if p["property_type"] == property_type]
-    if furnished is not None:
-        properties = [p for p in properties if p["furnished"] == furnished]
-    if pets_allowed is not None:
-        properties = [p for p in properties if p["pets_allowed"] == pets_allowed]
-    if parking is not None:
-        properties = [p for p in properties if p["parking"] == parking]
-    if balcony_garden is not None:
-        properties = [p for p in properties if p["balcony_garden"] == balcony_garden]
-    if country:
-        properties = [p for p in properties if p["country"] == country]
-    if featured is not None:
-        properties = [p for p in properties if p["featured"] == featured]
-    
-    return properties[:limit]
-
-@app.get("/api/properties/{property_id}", response_model=Property)
+    if _cannot_match(country, property_type, min_price, max_price):
+        return Response(b"[]", media_type="application/json")
+    # mock_properties is static, so identical queries share cached results; any future
+    # write path must clear _matching_rows, _compute and _DEFAULT_CACHE.
+    if not (location or property_type or country) and all(value is None for value in (
+        min_price, max_price, bedrooms, bathrooms, furnished, pets_allowed, parking, balcony_garden, featured
+    )):
+        # Slicing semantics, so negative limits behave as they always have.
+        count = slice(limit).indices(len(mock_properties))[1]
+        if count == len(mock_properties):
+            return Response(CANONICAL_BYTES, media_type="application/json")
+        if count > STREAM_MIN_ROWS:
+            return StreamingResponse(_stream_rows(range(count)), media_type="application/json")
+        return Response(_default_body(count), media_type="application/json")
+    key = (location, min_price, max_price, bedrooms, bathrooms, property_type, furnished,
+           pets_allowed, parking, balcony_garden, country, featured, limit)
+    rows = _matching_rows(key)
+    if len(rows) > STREAM_MIN_ROWS:
+        return StreamingResponse(_stream_rows(rows), media_type="application/json")
+    return Response(_compute(key), media_type="application/json")
+
+@app.get("/api/properties/{property_id}", response_model=None, responses={200: {"model": Property}})
 async def get_property(property_id: str):
-    for prop in mock_properties:
-        if prop["id"] == property_id:
-            return prop
-    raise HTTPException(status_code=404, detail="Property not found")
+    body = PROP_JSON.get(property_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Property not found")
+    return Response(body, media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn